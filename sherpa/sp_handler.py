@@ -1,16 +1,39 @@
 # RunPod Serverless: Vietnamese ASR (Sherpa-ONNX, Zipformer-RNNT)
-import os, time, uuid, base64, logging, subprocess, json, re
+import os, time, uuid, base64, logging, subprocess, queue, threading, fcntl, functools, asyncio
+
+# Không cho threadpool spin-wait giữ 100% CPU giữa các request (phải set trước khi import onnxruntime)
+os.environ.setdefault("OMP_WAIT_POLICY", "PASSIVE")
+# Tải model song song bằng hf_transfer (phải set trước khi import huggingface_hub)
+os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
 import runpod
+import numpy as np
+import orjson
+import soundfile as sf
+from scipy.signal import resample_poly
+import sherpa_onnx
 from huggingface_hub import snapshot_download
 
 # ------------------------------
 # CONFIG
 # ------------------------------
 MODEL_ID  = os.getenv("MODEL_ID", "hynt/Zipformer-30M-RNNT-6000h")
-MODEL_DIR = os.getenv("MODEL_DIR", "/models/Zipformer-30M-RNNT-6000h")
+MODEL_DIR = os.getenv("MODEL_DIR", "/runpod-volume/models/Zipformer-30M-RNNT-6000h")
 OUT_DIR   = os.getenv("OUT_DIR", "/runpod-volume/jobs")
 NUM_THREADS = os.getenv("NUM_THREADS", "1")
 HF_TOKEN = os.getenv("HF_TOKEN")
+SAMPLE_RATE = 16000
+INT16_SCALE = np.float32(1.0 / 32768.0)
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "8"))
+LOOP_INTERVAL_MS = int(os.getenv("LOOP_INTERVAL_MS", "10"))
+# decode_streams pad mọi stream theo stream dài nhất → giới hạn (số stream × độ dài dài nhất) mỗi batch
+MAX_BATCH_SAMPLES = int(float(os.getenv("MAX_BATCH_SEC", "60")) * SAMPLE_RATE)
+MIN_SAMPLES = SAMPLE_RATE // 10  # audio < 0.1s không đủ frame cho encoder
+# Số job RunPod giao đồng thời cho 1 worker. Mọi job decode qua 1 thread batch duy nhất
+# (dùng NUM_THREADS intra-op threads), nên: NUM_THREADS ≈ số core vật lý, MAX_CONCURRENCY ≈ MAX_BATCH_SIZE
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", str(MAX_BATCH_SIZE)))
+# Ưu tiên model int8 (nhẹ hơn ~4x); đạt throughput cao nhất trên CPU có VNNI (Ice Lake+, Zen4+)
+USE_INT8 = os.getenv("USE_INT8", "1") == "1"
 
 os.makedirs(OUT_DIR, exist_ok=True)
 
@@ -20,86 +43,207 @@ log = logging.getLogger("SherpaASR")
 # ------------------------------
 # MODEL DOWNLOAD
 # ------------------------------
-def ensure_model():
-    if not os.path.exists(MODEL_DIR) or not os.listdir(MODEL_DIR):
-        log.info(f"[MODEL] Downloading {MODEL_ID} → {MODEL_DIR}")
-        snapshot_download(
-            repo_id=MODEL_ID,
-            local_dir=MODEL_DIR,
-            local_dir_use_symlinks=False,
-            token=HF_TOKEN
-        )
+def model_patterns() -> list:
+    """Chỉ tải các file thực sự được load (bỏ README, wav demo, bản precision không dùng)"""
+    if USE_INT8:
+        onnx = ["*.int8.onnx"]
     else:
+        onnx = [f"{name}-epoch-20-avg-10.onnx" for name in ("encoder", "decoder", "joiner")]
+    return ["tokens.txt", "bpe.model", "*.json"] + onnx
+
+def model_present() -> bool:
+    """MODEL_DIR đã có đủ file đúng precision chưa (volume cũ / model bake sẵn trong image)"""
+    try:
+        find_model_files(MODEL_DIR)
+        return True
+    except OSError:
+        return False
+
+def download_model(complete: str):
+    log.info(f"[MODEL] Downloading {MODEL_ID} → {MODEL_DIR}")
+    snapshot_download(
+        repo_id=MODEL_ID,
+        local_dir=MODEL_DIR,
+        local_dir_use_symlinks=False,
+        token=HF_TOKEN,
+        allow_patterns=model_patterns(),
+        max_workers=8
+    )
+    open(complete, "w").close()
+
+def ensure_model():
+    # Model nằm trên persistent volume: pod mới dùng lại, không tải lại từ HF.
+    # Sentinel chỉ được ghi sau khi tải xong → không nhầm với lần tải dở dang.
+    # Sentinel tách theo precision: volume đang có int8 thì pod USE_INT8=0 vẫn tải bản fp32 (và ngược lại).
+    complete = os.path.join(MODEL_DIR, f".complete-{'int8' if USE_INT8 else 'fp32'}")
+    if os.path.exists(complete):
         log.info(f"[MODEL] Found model at {MODEL_DIR}")
+        return
+    
+    # Chưa có sentinel nhưng đã đủ file (MODEL_DIR có từ trước, có thể read-only/offline) → không tải lại
+    if model_present():
+        log.info(f"[MODEL] Found model files at {MODEL_DIR}")
+        try:
+            open(complete, "w").close()
+        except OSError as e:
+            log.info(f"[MODEL] Cannot write sentinel {complete}: {e}")
+        return
+    
+    # Khóa để nhiều pod khởi động cùng lúc không ghi đè lên nhau
+    models_root = os.path.dirname(MODEL_DIR)
+    try:
+        os.makedirs(models_root, exist_ok=True)
+        lock = open(os.path.join(models_root, ".lock"), "w")
+    except OSError as e:
+        log.warning(f"[MODEL] Cannot create lock in {models_root}: {e}; downloading without lock")
+        download_model(complete)
+        return
+    
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(complete):
+                log.info(f"[MODEL] Found model at {MODEL_DIR} (downloaded by another worker)")
+                return
+            download_model(complete)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
 
+@functools.lru_cache(maxsize=1)
 def find_model_files(model_dir: str):
-    """Tìm các file model cần thiết"""
+    """Tìm các file model cần thiết (1 lần scandir thay vì stat từng file)"""
+    names = {e.name for e in os.scandir(model_dir)}
+    
     tokens_candidates = ["tokens.txt", "bpe.model", "config.json"]
-    tokens_path = None
-    for t in tokens_candidates:
-        p = os.path.join(model_dir, t)
-        if os.path.exists(p):
-            tokens_path = p
-            break
+    tokens_path = next((os.path.join(model_dir, t) for t in tokens_candidates if t in names), None)
     
     if not tokens_path:
         raise FileNotFoundError("Cannot find tokens file in model dir")
     
-    encoder = os.path.join(model_dir, "encoder-epoch-20-avg-10.int8.onnx")
-    if not os.path.exists(encoder):
-        encoder = os.path.join(model_dir, "encoder-epoch-20-avg-10.onnx")
-    
-    decoder = os.path.join(model_dir, "decoder-epoch-20-avg-10.int8.onnx")
-    if not os.path.exists(decoder):
-        decoder = os.path.join(model_dir, "decoder-epoch-20-avg-10.onnx")
+    def pick(name: str) -> str:
+        # Chỉ dùng đúng precision theo USE_INT8: model_patterns() chỉ tải 1 loại,
+        # nên không fallback sang file chưa từng được tải
+        fname = f"{name}-epoch-20-avg-10.int8.onnx" if USE_INT8 else f"{name}-epoch-20-avg-10.onnx"
+        if fname not in names:
+            raise FileNotFoundError(f"Cannot find {fname} in {model_dir} (USE_INT8={int(USE_INT8)})")
+        return os.path.join(model_dir, fname)
     
-    joiner = os.path.join(model_dir, "joiner-epoch-20-avg-10.int8.onnx")
-    if not os.path.exists(joiner):
-        joiner = os.path.join(model_dir, "joiner-epoch-20-avg-10.onnx")
+    encoder = pick("encoder")
+    decoder = pick("decoder")
+    joiner = pick("joiner")
     
     return tokens_path, encoder, decoder, joiner
 
 ensure_model()
+TOKENS_PATH, ENCODER_PATH, DECODER_PATH, JOINER_PATH = find_model_files(MODEL_DIR)
+
+# ------------------------------
+# RECOGNIZER (load 1 lần, dùng lại cho mọi job)
+# ------------------------------
+def create_recognizer():
+    """Khởi tạo OfflineRecognizer từ các file model"""
+    log.info(f"[MODEL] Using tokens: {os.path.basename(TOKENS_PATH)}")
+    log.info(f"[MODEL] Loading {os.path.basename(ENCODER_PATH)}, {os.path.basename(DECODER_PATH)}, {os.path.basename(JOINER_PATH)}")
+    return sherpa_onnx.OfflineRecognizer.from_transducer(
+        encoder=ENCODER_PATH,
+        decoder=DECODER_PATH,
+        joiner=JOINER_PATH,
+        tokens=TOKENS_PATH,
+        # sherpa-onnx chuyển num_threads thành intra-op threads của ORT session
+        num_threads=int(NUM_THREADS),
+        provider="cpu",
+        decoding_method="greedy_search"
+    )
+
+def warmup():
+    """Decode 1 giây im lặng để ORT cấp phát arena/kernel cache trước job thật"""
+    t0 = time.time()
+    stream = recognizer.create_stream()
+    stream.accept_waveform(SAMPLE_RATE, np.zeros(SAMPLE_RATE, dtype=np.float32))
+    recognizer.decode_streams([stream])
+    log.info(f"[MODEL] Warmup done ({time.time() - t0:.2f}s)")
+
+recognizer = create_recognizer()
+warmup()
 
 # ------------------------------
-# PARSE OUTPUT
+# BATCH DECODER
 # ------------------------------
-def extract_result_from_output(stdout: str, stderr: str) -> dict:
+# Các job chạy đồng thời được gom lại và decode chung trong 1 lần decode_streams,
+# giống --max-batch-size / --loop-interval-ms của sherpa-onnx websocket server.
+decode_queue = queue.Queue()
+
+def decode_batch(batch: list):
+    """Decode 1 batch; nếu lỗi thì decode lại từng stream để lỗi chỉ gắn vào đúng job hỏng"""
+    try:
+        recognizer.decode_streams([req["stream"] for req in batch])
+    except Exception as e:
+        if len(batch) == 1:
+            log.error(f"[BATCH] decode_streams failed: {e}")
+            batch[0]["error"] = e
+        else:
+            log.warning(f"[BATCH] decode_streams failed for {len(batch)} streams, retrying one by one: {e}")
+            for req in batch:
+                try:
+                    recognizer.decode_streams([req["stream"]])
+                except Exception as err:
+                    log.error(f"[BATCH] decode_streams failed: {err}")
+                    req["error"] = err
+    
+    for req in batch:
+        req["event"].set()
+
+def decode_loop():
     """
-    Parse full JSON result từ sherpa-onnx output.
-    Returns: {"text": "...", "timestamps": [...], "tokens": [...]}
+    Thread nền: gom tối đa MAX_BATCH_SIZE stream trong LOOP_INTERVAL_MS rồi decode 1 lần.
+    Stream làm batch vượt MAX_BATCH_SAMPLES (sau khi pad) được để lại cho batch sau,
+    nên file dài sẽ được decode riêng, không bắt các job ngắn chờ cùng.
     """
-    combined = stderr + "\n" + stdout
-    
-    # Method 1: Parse complete JSON object
-    for line in combined.split('\n'):
-        line = line.strip()
-        if line.startswith('{') and '"text"' in line and '"timestamps"' in line:
+    pending = None
+    while True:
+        first = pending if pending is not None else decode_queue.get()
+        pending = None
+        batch = [first]
+        longest = first["num_samples"]
+        deadline = time.monotonic() + LOOP_INTERVAL_MS / 1000.0
+        while len(batch) < MAX_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
             try:
-                obj = json.loads(line)
-                if 'text' in obj and obj['text'].strip():
-                    return {
-                        "text": obj['text'].strip(),
-                        "timestamps": obj.get('timestamps', []),
-                        "tokens": obj.get('tokens', []),
-                        "words": obj.get('words', [])
-                    }
-            except json.JSONDecodeError:
-                continue
-    
-    # Method 2: Regex fallback - tìm text only
-    json_pattern = r'\{[^{}]*"text"\s*:\s*"([^"]*)"[^{}]*\}'
-    matches = re.findall(json_pattern, combined)
-    if matches:
-        return {
-            "text": matches[-1].strip(),
-            "timestamps": [],
-            "tokens": [],
-            "words": []
-        }
-    
-    return {"text": "", "timestamps": [], "tokens": [], "words": []}
+                req = decode_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            
+            padded_longest = max(longest, req["num_samples"])
+            if padded_longest * (len(batch) + 1) > MAX_BATCH_SAMPLES:
+                pending = req
+                break
+            batch.append(req)
+            longest = padded_longest
+        
+        decode_batch(batch)
+
+def decode(stream, num_samples: int):
+    """Đưa stream vào hàng đợi batch và chờ kết quả"""
+    req = {"stream": stream, "num_samples": num_samples, "event": threading.Event(), "error": None}
+    decode_queue.put(req)
+    req["event"].wait()
+    if req["error"] is not None:
+        raise req["error"]
+    return stream.result
 
+def transcribe(samples: np.ndarray):
+    """Tạo stream cho waveform 16kHz mono và decode qua hàng đợi batch"""
+    stream = recognizer.create_stream()
+    stream.accept_waveform(SAMPLE_RATE, samples)
+    return decode(stream, len(samples))
+
+threading.Thread(target=decode_loop, name="sherpa-decoder", daemon=True).start()
+
+# ------------------------------
+# WORD SEGMENTS
+# ------------------------------
 def create_word_segments(text: str, timestamps: list, tokens: list) -> list:
     """
     Tạo word-level segments từ token-level timestamps.
@@ -108,45 +252,107 @@ def create_word_segments(text: str, timestamps: list, tokens: list) -> list:
     if not timestamps or not tokens or len(timestamps) != len(tokens):
         return []
     
-    segments = []
-    current_word = ""
-    word_start = None
+    # Token bắt đầu bằng space = từ mới (token đầu tiên luôn mở từ mới)
+    is_start = np.fromiter((t.startswith(' ') for t in tokens), dtype=bool, count=len(tokens))
+    is_start[0] = True
+    start_idx = np.nonzero(is_start)[0]
+    end_idx = np.r_[start_idx[1:], len(tokens)] - 1
     
-    for i, (token, ts) in enumerate(zip(tokens, timestamps)):
-        token = token.strip()
-        
-        # Token bắt đầu bằng space = từ mới
-        if token.startswith(' ') or i == 0:
-            # Lưu từ cũ nếu có
-            if current_word and word_start is not None:
-                word_end = timestamps[i-1] if i > 0 else ts
-                segments.append({
-                    "word": current_word.strip(),
-                    "start": round(word_start, 2),
-                    "end": round(word_end, 2)
-                })
-            
-            # Bắt đầu từ mới
-            current_word = token
-            word_start = ts
-        else:
-            # Tiếp tục từ hiện tại
-            current_word += token
+    ts = np.asarray(timestamps, dtype=np.float64)
+    starts = np.round(ts[start_idx], 2).tolist()
+    ends = np.round(ts[end_idx], 2).tolist()
+    words = [''.join(tokens[s:e + 1]).strip() for s, e in zip(start_idx.tolist(), end_idx.tolist())]
     
-    # Lưu từ cuối cùng
-    if current_word and word_start is not None:
-        segments.append({
-            "word": current_word.strip(),
-            "start": round(word_start, 2),
-            "end": round(timestamps[-1], 2)
-        })
+    return [
+        {"word": w, "start": st, "end": en}
+        for w, st, en in zip(words, starts, ends)
+        if w
+    ]
+
+# ------------------------------
+# AUDIO
+# ------------------------------
+def convert_with_ffmpeg(audio_path: str) -> np.ndarray:
+    """Fallback: dùng ffmpeg chuẩn hóa về 16kHz mono cho các định dạng soundfile không đọc được"""
+    log.info(f"[AUDIO] Converting {audio_path} to 16kHz mono (ffmpeg)")
     
-    return segments
+    # Xuất PCM s16le thẳng ra stdout, không ghi file WAV tạm
+    # -loglevel error: stderr gần như rỗng khi thành công, chỉ còn lỗi thật
+    p = subprocess.Popen(
+        ["ffmpeg", "-loglevel", "error", "-i", audio_path, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=1 << 20
+    )
+    raw, err = p.communicate()
+    
+    if p.returncode != 0:
+        stderr = err.decode("utf-8", errors="replace")
+        log.error(f"[AUDIO] FFmpeg error: {stderr}")
+        raise RuntimeError(stderr)
+    
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32) * INT16_SCALE
+
+def read_mono(f: sf.SoundFile) -> np.ndarray:
+    """
+    Đọc SoundFile vào 1 buffer mono float32 cấp phát sẵn.
+    File nhiều kênh được downmix theo từng block 1 giây → không giữ cả mảng (frames × channels) trong RAM.
+    """
+    samples = np.empty(f.frames, dtype=np.float32)
+    if f.channels == 1:
+        n = f.read(dtype="float32", out=samples).shape[0]
+        return samples[:n]
+    
+    pos = 0
+    for block in f.blocks(blocksize=SAMPLE_RATE, dtype="float32", always_2d=True):
+        n = block.shape[0]
+        np.mean(block, axis=1, out=samples[pos:pos + n])
+        pos += n
+    return samples[:pos]
+
+def load_audio(audio_path: str) -> np.ndarray:
+    """
+    Đọc audio thành waveform float32 16kHz mono.
+    Đọc trực tiếp bằng soundfile, chỉ resample khi cần; ffmpeg chỉ dùng khi soundfile không đọc được.
+    """
+    try:
+        with sf.SoundFile(audio_path) as f:
+            sr = f.samplerate
+            samples = read_mono(f)
+    except Exception as e:
+        log.info(f"[AUDIO] soundfile cannot read {audio_path}: {e}")
+        return convert_with_ffmpeg(audio_path)
+    
+    if sr != SAMPLE_RATE:
+        log.info(f"[AUDIO] Resampling {sr}Hz → {SAMPLE_RATE}Hz")
+        samples = resample_poly(samples, SAMPLE_RATE, sr).astype(np.float32)
+    return samples
+
+# ------------------------------
+# RESULT FILE
+# ------------------------------
+def write_file(path: str, payload: bytes, job_id: str):
+    # Ghi ra .tmp riêng của job rồi os.replace → người đọc chỉ thấy "chưa có file" hoặc file hoàn chỉnh,
+    # kể cả khi nhiều job đồng thời dùng chung outfile
+    tmp_path = f"{path}.{job_id}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        log.error(f"[SAVE] Cannot write {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except:
+            pass
+
+def save_result(path: str, asr_result: dict, job_id: str):
+    """Ghi kết quả ra file ở thread nền, không chặn response"""
+    payload = orjson.dumps(asr_result)
+    threading.Thread(target=write_file, args=(path, payload, job_id), daemon=True).start()
 
 # ------------------------------
 # CORE HANDLER
 # ------------------------------
-def handler(job):
+async def handler(job):
     """
     Input JSON:
     {
@@ -155,6 +361,9 @@ def handler(job):
       "include_timestamps": true/false (default: true),
       "outfile": "optional_output.txt"
     }
+    
+    File kết quả ("path" trong response) được ghi ở thread nền nên có thể xuất hiện
+    chậm hơn response một chút; file chỉ hiện ra khi đã ghi xong hoàn toàn.
     """
     inp = job.get("input", {})
     audio_path = inp.get("audio_path")
@@ -167,52 +376,33 @@ def handler(job):
     out_path = os.path.join(OUT_DIR, out_name)
 
     # Chuẩn hóa audio
-    fixed_wav = f"/tmp/{job_id}_16k.wav"
-    log.info(f"[AUDIO] Converting {audio_path} to 16kHz mono")
-    
-    ffmpeg_result = subprocess.run(
-        ["ffmpeg", "-y", "-i", audio_path, "-ac", "1", "-ar", "16000", "-sample_fmt", "s16", fixed_wav],
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
-    
-    if ffmpeg_result.returncode != 0:
-        log.error(f"[AUDIO] FFmpeg error: {ffmpeg_result.stderr}")
-        return {"error": "Audio conversion failed", "details": ffmpeg_result.stderr}
-
-    # Tìm model files
     try:
-        tokens_path, encoder, decoder, joiner = find_model_files(MODEL_DIR)
-        log.info(f"[MODEL] Using tokens: {os.path.basename(tokens_path)}")
+        samples = await asyncio.to_thread(load_audio, audio_path)
     except Exception as e:
-        return {"error": f"Model files not found: {str(e)}"}
-
-    # Build command
-    cmd = [
-        "sherpa-onnx-offline",
-        f"--tokens={tokens_path}",
-        f"--encoder={encoder}",
-        f"--decoder={decoder}",
-        f"--joiner={joiner}",
-        f"--num-threads={NUM_THREADS}",
-        fixed_wav
-    ]
-
-    log.info(f"[JOB] Decoding {audio_path} (job {job_id})")
+        return {"error": "Audio conversion failed", "details": str(e)}
     
-    t0 = time.time()
-    result = subprocess.run(cmd, text=True, capture_output=True)
-    elapsed = time.time() - t0
-
-    if result.returncode != 0:
-        log.error(f"[ERROR] Sherpa-ONNX failed with returncode {result.returncode}")
-        return {
-            "error": "Sherpa-ONNX failed",
-            "returncode": result.returncode,
-            "stderr": result.stderr[-500:]
+    # Audio rỗng/quá ngắn: không đưa vào hàng đợi batch, trả transcript rỗng như bình thường
+    if len(samples) < MIN_SAMPLES:
+        log.warning(f"[AUDIO] Too short: {len(samples)} samples ({audio_path}), skipping decode")
+        elapsed = 0.0
+        asr_result = {"text": "", "timestamps": [], "tokens": []}
+    else:
+        log.info(f"[JOB] Decoding {audio_path} (job {job_id})")
+        
+        t0 = time.time()
+        try:
+            # Chạy ở thread riêng để event loop vẫn nhận job khác trong lúc chờ batch decode
+            result = await asyncio.to_thread(transcribe, samples)
+        except Exception as e:
+            log.error(f"[ERROR] Sherpa-ONNX failed: {e}")
+            return {"error": "Sherpa-ONNX failed", "details": str(e)}
+        elapsed = time.time() - t0
+        
+        asr_result = {
+            "text": result.text.strip(),
+            "timestamps": list(result.timestamps),
+            "tokens": list(result.tokens)
         }
-
-    # Parse full result
-    asr_result = extract_result_from_output(result.stdout, result.stderr)
     transcript = asr_result["text"]
     
     if not transcript:
@@ -235,17 +425,10 @@ def handler(job):
         log.info(f"[SEGMENTS] Created {len(word_segments)} word segments")
 
     # Save to file
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(asr_result, f, ensure_ascii=False, indent=2)
+    save_result(out_path, asr_result, job_id)
 
     log.info(f"[DONE] {audio_path} → {out_path} ({elapsed:.2f}s)")
 
-    # Clean up
-    try:
-        os.remove(fixed_wav)
-    except:
-        pass
-
     # Return based on format
     return_format = inp.get("return", "json")
     
@@ -259,12 +442,13 @@ def handler(job):
         }
     
     elif return_format == "base64":
-        # Text as base64
-        b64 = base64.b64encode(transcript.encode("utf-8")).decode("utf-8")
+        # Text as base64 (deprecated: response JSON đã an toàn cho UTF-8, nên dùng "text")
+        # Output base64 chỉ gồm ký tự ASCII → decode ascii là đủ
+        b64 = base64.b64encode(transcript.encode("utf-8"))
         return {
             "job_id": job_id,
             "elapsed_sec": round(elapsed, 2),
-            "text_b64": b64,
+            "text_b64": b64.decode("ascii"),
             "path": out_path
         }
     
@@ -285,4 +469,7 @@ def handler(job):
 # ------------------------------
 # START WORKER
 # ------------------------------
-runpod.serverless.start({"handler": handler})
+runpod.serverless.start({
+    "handler": handler,
+    "concurrency_modifier": lambda current: MAX_CONCURRENCY
+})